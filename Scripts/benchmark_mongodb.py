@@ -0,0 +1,75 @@
+import argparse
+import subprocess
+import sys
+import time
+
+from Scripts.mongodb import MongodbStorage, close_clients
+
+
+def measure_import_time(module: str, repeat: int) -> float:
+    """
+    Returns the best wall time of importing <module> in a fresh interpreter
+
+    :param module: The module to import
+    :param repeat: The amount of measured runs
+    :return: The time in seconds
+    """
+    code = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)".format(
+        module=module)
+    return min(float(subprocess.check_output([sys.executable, "-c", code])) for _ in range(repeat))
+
+
+def measure_storages(host: str, port: int, amount: int, shared_client: bool) -> tuple:
+    """
+    Creates <amount> storages, pings the server with each of them and measures the time and the connections opened
+
+    :param host: The host name or a mongodb:// URI
+    :param port: The port
+    :param amount: The amount of storages
+    :param shared_client: Use the process-wide client?
+    :return: A tuple (time in seconds, amount of opened connections)
+    """
+    monitor = MongodbStorage(host=host, port=port, shared_client=False)
+    before = monitor.db.command("serverStatus")["connections"]["current"]
+
+    start = time.perf_counter()
+    storages = []
+    for _ in range(amount):
+        storage = MongodbStorage(host=host, port=port, shared_client=shared_client)
+        storage.db.command("ping")
+        storages.append(storage)
+    duration = time.perf_counter() - start
+
+    after = monitor.db.command("serverStatus")["connections"]["current"]
+    if not shared_client:
+        for storage in storages:
+            storage.client.close()
+    close_clients()
+    monitor.client.close()
+    return duration, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark startup time and connection count of MongodbStorage")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=27017)
+    parser.add_argument("--storages", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-server", action="store_true", help="Only measure import times")
+    args = parser.parse_args()
+
+    for module in ["Scripts.mongodb", "pymongo"]:
+        print("import {module}: {time:.1f} ms".format(module=module,
+                                                       time=measure_import_time(module, args.repeat) * 1000))
+
+    if args.skip_server:
+        return
+    for shared_client in [False, True]:
+        duration, connections = measure_storages(args.host, args.port, args.storages, shared_client)
+        print("{amount} storages ({kind} client): {time:.1f} ms, {connections} connections opened".format(
+            amount=args.storages, kind="shared" if shared_client else "own", time=duration * 1000,
+            connections=connections))
+
+
+if __name__ == "__main__":
+    main()
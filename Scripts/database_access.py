@@ -68,22 +68,47 @@ class DataStorage(ABC):
         pass
 
     @abstractmethod
-    def iterate_single_post(self, filter: dict) -> list:
+    def iterate_single_post(self, filter: dict, print_progress: bool = True, projection: list = None,
+                            sort_by_id: bool = False) -> list:
         """
         Iterator that returns a single Post object with each iteration
         
         :param filter: The filter to search for
+        :param print_progress: Print the progress of this iteration?
+        :param projection: The keys that are returned (including all mandatory keys), None for all keys
+        :param sort_by_id: Return the entries sorted by their id, so that the order is the same on every run?
         :return: A Post object with each iteration
         """
         pass
 
     @abstractmethod
-    def iterate_single_comment(self, filter: dict, print_progress: bool = True) -> list:
+    def insert_multiple_posts(self, posts: list):
+        """
+        Inserts a list of new Posts into the data in one bulk operation. Posts whose id already exists are skipped
+
+        :param posts: A list of Post objects
+        """
+        pass
+
+    @abstractmethod
+    def insert_multiple_comments(self, comments: list):
+        """
+        Inserts a list of new Comments into the data in one bulk operation. Comments whose id already exists are skipped
+
+        :param comments: A list of Comment objects
+        """
+        pass
+
+    @abstractmethod
+    def iterate_single_comment(self, filter: dict, print_progress: bool = True, projection: list = None,
+                               sort_by_id: bool = False) -> list:
         """
         Iterator that returns a single Comment object with each iteration
 
         :param filter: The filter to search for
         :param print_progress: Print the progress of this iteration?
+        :param projection: The keys that are returned (including all mandatory keys), None for all keys
+        :param sort_by_id: Return the entries sorted by their id, so that the order is the same on every run?
         :return: A Comment object with each iteration
         """
         pass
@@ -118,11 +143,23 @@ class DataStorage(ABC):
         pass
 
     @abstractmethod
-    def iterate_single_emotion(self, filter: dict, print_progress: bool = True) -> list:
+    def insert_multiple_emotions(self, emotions: list):
+        """
+        Inserts a list of new emotions into the data in one bulk operation. Emotions whose id already exists are skipped
+
+        :param emotions: A list of Emotion objects
+        """
+        pass
+
+    @abstractmethod
+    def iterate_single_emotion(self, filter: dict, print_progress: bool = True, projection: list = None,
+                               sort_by_id: bool = False) -> list:
         """
         Iterator that returns a single Emotion object with each iteration
 
         :param print_progress: If true the progress of iterating will be printed
+        :param projection: The keys that are returned (including all mandatory keys), None for all keys
+        :param sort_by_id: Return the entries sorted by their id, so that the order is the same on every run?
         :param filter: The filter to search for
         :return: A Emotion object with each iteration
         """
@@ -147,6 +184,15 @@ class DataStorage(ABC):
         """
         pass
 
+    @abstractmethod
+    def insert_multiple_sentences(self, sentences: list):
+        """
+        Inserts a list of new sentences into the data in one bulk operation. Sentences whose id already exists are skipped
+
+        :param sentences: A list of Sentence objects
+        """
+        pass
+
     @abstractmethod
     def select_single_sentence(self, filter: dict) -> Sentence:
         """
@@ -158,11 +204,14 @@ class DataStorage(ABC):
         pass
 
     @abstractmethod
-    def iterate_single_sentence(self, filter: dict, print_progress: bool = True) -> list:
+    def iterate_single_sentence(self, filter: dict, print_progress: bool = True, projection: list = None,
+                                sort_by_id: bool = False) -> list:
         """
         Iterator that returns a single Sentence object with each iteration
 
         :param print_progress: If true the progress of iterating will be printed
+        :param projection: The keys that are returned (including all mandatory keys), None for all keys
+        :param sort_by_id: Return the entries sorted by their id, so that the order is the same on every run?
         :param filter: The filter to search for
         :return: A Sentence object with each iteration
         """
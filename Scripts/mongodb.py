@@ -1,19 +1,124 @@
-import pymongo
+import os
+import threading
 
 from Scripts.data_types import Post, Comment, Emotion, Sentence
 from Scripts.database_access import DataStorage
 
+# pymongo is imported lazily (when the first client is created), so that importing this module stays cheap
+
+# (host, port, max_pool_size, min_pool_size, compressors) -> MongoClient, shared by all storages of this process
+_clients = {}
+# The process that created the clients in <_clients>. MongoClients are not fork-safe, a child process creates its own
+_clients_pid = os.getpid()
+_clients_lock = threading.Lock()
+# Increased by close_clients(), storages holding a client of an older generation resolve their client again
+_clients_generation = 0
+
+
+def get_client(host="localhost", port=27017, max_pool_size=100, min_pool_size=0, compressors=None):
+    """
+    Returns the process-wide MongoClient for the given connection settings, the client is created on first use.
+    After a fork the clients inherited from the parent process are discarded and new ones are created
+
+    :param host: The host name or a mongodb:// URI
+    :param port: The port
+    :param max_pool_size: The maximum amount of connections of the client's pool
+    :param min_pool_size: The amount of connections the pool keeps open
+    :param compressors: Comma separated list of wire compressors (e.g. "zstd,snappy,zlib"), None for no compression
+    :return: A MongoClient
+    """
+    key = (host, port, max_pool_size, min_pool_size, compressors)
+    with _clients_lock:
+        _discard_inherited_clients()
+        client = _clients.get(key)
+        if client is None:
+            client = _create_client(host, port, max_pool_size, min_pool_size, compressors)
+            _clients[key] = client
+        return client
+
+
+def close_clients():
+    """
+    Closes all process-wide MongoClients that were created by this process. Storages using one of them get a new
+    client on their next access
+    """
+    global _clients_generation
+    with _clients_lock:
+        _clients_generation += 1
+        _discard_inherited_clients()
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+def _discard_inherited_clients():
+    """
+    Forgets the clients inherited from the parent process after a fork. They are not closed, because their sockets
+    are still used by the parent process. Has to be called while holding <_clients_lock>
+    """
+    global _clients_pid
+    if _clients_pid != os.getpid():
+        _clients.clear()
+        _clients_pid = os.getpid()
+
+
+def _create_client(host, port, max_pool_size, min_pool_size, compressors):
+    import pymongo
+    options = {}
+    if compressors is not None:
+        options["compressors"] = compressors
+    return pymongo.MongoClient(host=host, port=port, maxPoolSize=max_pool_size, minPoolSize=min_pool_size,
+                               **options)
+
 
 class MongodbStorage(DataStorage):
+    # Error code MongoDB reports for a duplicate _id
+    DUPLICATE_KEY_ERROR = 11000
+
     # Tables
     TABLE_POSTS = "posts"
     TABLE_COMMENTS = "comments"
     TABLE_EMOTION = "emotion"
     TABLE_SENTENCE = "sentence"
 
-    def __init__(self, host="localhost", port=27017, database="research_project"):
-        self.client = pymongo.MongoClient(host=host, port=port)
-        self.db = self.client[database]
+    def __init__(self, host="localhost", port=27017, database="research_project", max_pool_size=100, min_pool_size=0,
+                 compressors=None, shared_client=True):
+        """
+        :param host: The host name or a mongodb:// URI
+        :param port: The port
+        :param database: The name of the database
+        :param max_pool_size: The maximum amount of connections of the client's pool
+        :param min_pool_size: The amount of connections the pool keeps open
+        :param compressors: Comma separated list of wire compressors (e.g. "zstd,snappy,zlib"), None for no compression
+        :param shared_client: Use the process-wide client for these settings instead of creating an own client?
+        """
+        self.__settings = (host, port, max_pool_size, min_pool_size, compressors)
+        self.__database = database
+        self.__shared_client = shared_client
+        self.__client = None
+        self.__client_pid = None
+        self.__client_generation = None
+
+    @property
+    def client(self):
+        """
+        The MongoClient of this storage. It is resolved on first use, again in a process that inherited this storage by
+        a fork, so that a child process never uses the client of its parent, and again after close_clients() closed the
+        shared client
+        """
+        outdated = self.__shared_client and self.__client_generation != _clients_generation
+        if self.__client is None or self.__client_pid != os.getpid() or outdated:
+            if self.__shared_client:
+                self.__client_generation = _clients_generation
+                self.__client = get_client(*self.__settings)
+            else:
+                self.__client = _create_client(*self.__settings)
+            self.__client_pid = os.getpid()
+        return self.__client
+
+    @property
+    def db(self):
+        return self.client[self.__database]
 
     ###########################################################################
     # Post-methods
@@ -48,18 +153,24 @@ class MongodbStorage(DataStorage):
         yield batch
         return
 
-    def iterate_single_post(self, filter: dict) -> list:
+    def insert_multiple_posts(self, posts: list):
+        self.__insert_many(MongodbStorage.TABLE_POSTS, [post.data for post in posts])
+
+    def iterate_single_post(self, filter: dict, print_progress: bool = True, projection: list = None,
+                            sort_by_id: bool = False) -> list:
         post_collection = self.db[MongodbStorage.TABLE_POSTS]
-        cursor = post_collection.find(filter=filter, no_cursor_timeout=True).batch_size(100)
+        cursor = self.__find(post_collection, filter, projection, sort_by_id)
 
         counter = 0
         size = cursor.count()
         for entry in cursor:
             counter += 1
-            print("\r%.2f%%" % (counter / size * 100), end='')
+            if print_progress:
+                print("\r%.2f%%" % (counter / size * 100), end='')
             yield Post(entry)
         cursor.close()
-        print("\n")
+        if print_progress:
+            print("\n")
 
     def select_multiple_posts(self, filter: dict) -> list:
         post_collection = self.db[MongodbStorage.TABLE_POSTS]
@@ -76,6 +187,7 @@ class MongodbStorage(DataStorage):
         return Post(result) if result is not None else None
 
     def select_newest_post(self) -> Post:
+        import pymongo
         post_collection = self.db[MongodbStorage.TABLE_POSTS]
         cursor = post_collection.find({}).sort(Post.COLL_DATE, pymongo.DESCENDING).limit(1)
         post = None
@@ -92,9 +204,10 @@ class MongodbStorage(DataStorage):
     # Comment-methods
     ###########################################################################
 
-    def iterate_single_comment(self, filter: dict, print_progress: bool = True) -> list:
+    def iterate_single_comment(self, filter: dict, print_progress: bool = True, projection: list = None,
+                               sort_by_id: bool = False) -> list:
         comment_collection = self.db[MongodbStorage.TABLE_COMMENTS]
-        cursor = comment_collection.find(filter=filter, no_cursor_timeout=True).batch_size(100)
+        cursor = self.__find(comment_collection, filter, projection, sort_by_id)
 
         counter = 0
         size = cursor.count()
@@ -111,6 +224,9 @@ class MongodbStorage(DataStorage):
         comment_collection = self.db[MongodbStorage.TABLE_COMMENTS]
         comment_collection.insert_one(comment.data)
 
+    def insert_multiple_comments(self, comments: list):
+        self.__insert_many(MongodbStorage.TABLE_COMMENTS, [comment.data for comment in comments])
+
     def count_comments(self, filter: dict) -> int:
         comment_collection = self.db[MongodbStorage.TABLE_COMMENTS]
         count = comment_collection.count(filter)
@@ -124,9 +240,13 @@ class MongodbStorage(DataStorage):
         comment_collection = self.db[MongodbStorage.TABLE_EMOTION]
         comment_collection.insert_one(emotion.data)
 
-    def iterate_single_emotion(self, filter: dict, print_progress: bool = True) -> list:
+    def insert_multiple_emotions(self, emotions: list):
+        self.__insert_many(MongodbStorage.TABLE_EMOTION, [emotion.data for emotion in emotions])
+
+    def iterate_single_emotion(self, filter: dict, print_progress: bool = True, projection: list = None,
+                               sort_by_id: bool = False) -> list:
         emotion_collection = self.db[MongodbStorage.TABLE_EMOTION]
-        cursor = emotion_collection.find(filter=filter, no_cursor_timeout=True).batch_size(100)
+        cursor = self.__find(emotion_collection, filter, projection, sort_by_id)
 
         counter = 0
         size = cursor.count()
@@ -157,9 +277,13 @@ class MongodbStorage(DataStorage):
         sentence_collection = self.db[MongodbStorage.TABLE_SENTENCE]
         sentence_collection.insert_one(sentence.data)
 
-    def iterate_single_sentence(self, filter: dict, print_progress: bool = True) -> list:
+    def insert_multiple_sentences(self, sentences: list):
+        self.__insert_many(MongodbStorage.TABLE_SENTENCE, [sentence.data for sentence in sentences])
+
+    def iterate_single_sentence(self, filter: dict, print_progress: bool = True, projection: list = None,
+                                sort_by_id: bool = False) -> list:
         sentence_collection = self.db[MongodbStorage.TABLE_SENTENCE]
-        cursor = sentence_collection.find(filter=filter, no_cursor_timeout=True).batch_size(100)
+        cursor = self.__find(sentence_collection, filter, projection, sort_by_id)
 
         counter = 0
         size = cursor.count()
@@ -175,3 +299,42 @@ class MongodbStorage(DataStorage):
     def update_sentence(self, sentence: Sentence):
         sentence_collection = self.db[MongodbStorage.TABLE_SENTENCE]
         sentence_collection.update_one({'_id': sentence.id}, {'$set': sentence.data})
+
+    ###########################################################################
+    # Helper-methods
+    ###########################################################################
+
+    def __find(self, collection, filter: dict, projection: list, sort_by_id: bool):
+        """
+        Returns a cursor over the entries of the collection matching the filter
+
+        :param collection: The pymongo collection
+        :param filter: The filter to search for
+        :param projection: The keys that are returned, None for all keys
+        :param sort_by_id: Sort the entries by their id?
+        :return: A pymongo cursor
+        """
+        cursor = collection.find(filter=filter, projection=projection, no_cursor_timeout=True).batch_size(100)
+        if sort_by_id:
+            import pymongo
+            cursor = cursor.sort("_id", pymongo.ASCENDING)
+        return cursor
+
+    def __insert_many(self, table: str, documents: list):
+        """
+        Bulk inserts the documents into the table. Documents whose _id already exists are skipped, so that an
+        interrupted bulk insert can simply be repeated
+
+        :param table: The name of the table
+        :param documents: A list of dictionaries
+        """
+        from pymongo.errors import BulkWriteError
+        if not documents:
+            return
+        try:
+            self.db[table].insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error["code"] != MongodbStorage.DUPLICATE_KEY_ERROR for error in errors) \
+                    or e.details.get("writeConcernErrors"):
+                raise
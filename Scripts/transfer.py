@@ -0,0 +1,468 @@
+import argparse
+import glob
+import gzip
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from Scripts.data_types import Post, Comment, Emotion, Sentence
+from Scripts.database_access import DataStorage
+
+# Collection name -> (iterate method, bulk insert method, data class)
+COLLECTIONS = {
+    "posts": ("iterate_single_post", "insert_multiple_posts", Post),
+    "comments": ("iterate_single_comment", "insert_multiple_comments", Comment),
+    "emotion": ("iterate_single_emotion", "insert_multiple_emotions", Emotion),
+    "sentence": ("iterate_single_sentence", "insert_multiple_sentences", Sentence),
+}
+
+FORMAT_JSONL = "jsonl"
+FORMAT_MSGPACK = "msgpack"
+FORMATS = [FORMAT_JSONL, FORMAT_MSGPACK]
+
+COMPRESSION_ZSTD = "zstd"
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_NONE = "none"
+COMPRESSIONS = [COMPRESSION_ZSTD, COMPRESSION_GZIP, COMPRESSION_NONE]
+
+# Compression -> file extension
+COMPRESSION_EXTENSIONS = {COMPRESSION_ZSTD: ".zst", COMPRESSION_GZIP: ".gz", COMPRESSION_NONE: ""}
+
+# Suffix of a shard file that is still being written
+PART_SUFFIX = ".part"
+
+
+def shard_path(directory: str, collection: str, index: int, format: str, compression: str) -> str:
+    """
+    Returns the file path of a single shard
+
+    :param directory: The directory containing the shards
+    :param collection: The name of the exported collection
+    :param index: The running number of the shard
+    :param format: The serialization format (jsonl or msgpack)
+    :param compression: The compression (zstd, gzip or none)
+    :return: The path of the shard file
+    """
+    name = "{collection}-{index:05d}.{format}{ext}".format(collection=collection, index=index, format=format,
+                                                           ext=COMPRESSION_EXTENSIONS[compression])
+    return os.path.join(directory, name)
+
+
+def optional_columns(collection: str) -> list:
+    """
+    Returns the columns of a collection that can be left out by a projection. All other columns are mandatory for
+    the collection's data class (posts: sentiment, emotion, comments_sentiment, comments_emotion and off_topic,
+    sentence: predicted, comments and emotion: none)
+
+    :param collection: The name of the collection
+    :return: A list of column names
+    """
+    _check_collection(collection)
+    data_class = COLLECTIONS[collection][2]
+    return [column for column in data_class.VALID_COLUMNS if column not in data_class.MANDATORY_COLUMNS]
+
+
+def export_collection(storage: DataStorage, collection: str, directory: str, filter: dict = None,
+                      projection: list = None, format: str = FORMAT_JSONL, compression: str = COMPRESSION_GZIP,
+                      shard_size: int = 100000, workers: int = 4, use_processes: bool = False,
+                      print_progress: bool = True) -> list:
+    """
+    Streams a collection into sharded, compressed files. The collection is read sorted by id with the storage's
+    iterate method, so at most <workers> + 1 shards of <shard_size> entries are held in memory at the same time
+    (<workers> shards being encoded and written in parallel and the one being filled). The arguments and, once the
+    export is complete, the list of shards are written to a manifest in <directory>. Shard files that already exist
+    are skipped without holding their entries, so an interrupted export can be resumed by running it again. Resuming
+    with other arguments than recorded in the manifest raises a ValueError. Because the entries are sorted by id, a
+    resumed export only writes the same shards as the interrupted one if the collection has not changed in between
+
+    :param storage: The storage to read from
+    :param collection: The name of the collection (posts, comments, emotion or sentence)
+    :param directory: The directory the shards are written to
+    :param filter: The filter to search for (passed to the storage, e.g. a MongoDB query)
+    :param projection: The keys that are exported, None to export all keys. It is passed to the storage (a MongoDB
+                       projection), so left out keys are not transferred. It has to contain all mandatory columns of
+                       the collection, only the columns returned by optional_columns() can be left out
+    :param format: The serialization format (jsonl or msgpack)
+    :param compression: The compression (zstd, gzip or none)
+    :param shard_size: The amount of entries per shard
+    :param workers: The amount of threads/processes encoding shards
+    :param use_processes: Encode in a process pool instead of a thread pool?
+    :param print_progress: Print the progress of the export?
+    :return: A list with the paths of all shards of this export
+    """
+    _check_collection(collection)
+    _check_format(format, compression)
+    _check_projection(collection, projection)
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = _export_manifest_path(directory, collection)
+    settings = _json_round_trip({"collection": collection, "filter": filter, "projection": projection,
+                                 "format": format, "compression": compression, "shard_size": shard_size})
+    if os.path.exists(manifest_path):
+        manifest = _read_json(manifest_path)
+        changed = sorted(key for key, value in settings.items() if manifest.get(key) != value)
+        if changed:
+            raise ValueError("'{directory}' contains an export of '{collection}' with other arguments ({changed}), "
+                             "resume it with the same arguments or use another directory".format(
+                                 directory=directory, collection=collection, changed=", ".join(changed)))
+    elif _list_shard_files(directory, collection):
+        raise ValueError("'{directory}' contains shards of '{collection}' without an export manifest, use another "
+                         "directory".format(directory=directory, collection=collection))
+    _write_json(manifest_path, dict(settings, complete=False, shards=[]))
+
+    iterate_method, _, _ = COLLECTIONS[collection]
+    iterator = getattr(storage, iterate_method)(filter if filter is not None else {}, print_progress=print_progress,
+                                                projection=projection, sort_by_id=True)
+
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    paths = []
+    pending = set()
+    with executor_class(max_workers=workers) as executor:
+        def submit(records: list):
+            while len(pending) >= workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    future.result()
+            pending.add(executor.submit(_write_shard, paths[-1], records, format, compression))
+
+        shard = []
+        counter = 0
+        for entry in iterator:
+            if counter == 0:
+                paths.append(shard_path(directory, collection, len(paths), format, compression))
+                exists = os.path.exists(paths[-1])
+            if not exists:
+                shard.append(_project(entry.data, projection))
+            counter += 1
+            if counter == shard_size:
+                if not exists:
+                    submit(shard)
+                shard = []
+                counter = 0
+        if shard:
+            submit(shard)
+
+        for future in pending:
+            future.result()
+
+    _write_json(manifest_path, dict(settings, complete=True, shards=[os.path.basename(path) for path in paths]))
+    return paths
+
+
+def import_collection(storage: DataStorage, collection: str, directory: str, where: dict = None,
+                      projection: list = None, target: str = None, batch_size: int = 1000,
+                      print_progress: bool = True) -> int:
+    """
+    Streams the shards listed in the manifest of a complete export back into a storage using its bulk insert method.
+    Other files in <directory> are ignored. If a <target> is given, the
+    names of completely imported shards are recorded in a manifest in <directory> and skipped on the next run, so an
+    interrupted import can be resumed by running it again with the same arguments. The manifest is specific to the
+    target, <where> and <projection>, importing the same directory into another target or with other arguments
+    starts from the beginning. Entries of a partially imported shard that already exist are skipped by the bulk
+    insert
+
+    :param storage: The storage to write to
+    :param collection: The name of the collection (posts, comments, emotion or sentence)
+    :param directory: The directory containing the shards
+    :param where: Only entries whose top level keys are equal to the values of this dictionary are imported. Query
+                  operators ("$gte", ...) are not supported, use the filter of the export for that
+    :param projection: The keys that are imported, None to import all keys. It has to contain all mandatory columns
+                       of the collection, only the columns returned by optional_columns() can be left out
+    :param target: A name that identifies the storage (e.g. "host:port/database"), None to not record any progress
+    :param batch_size: The amount of entries per bulk insert
+    :param print_progress: Print the progress of the import?
+    :return: The amount of entries passed to the bulk insert
+    """
+    _check_collection(collection)
+    _check_where(where)
+    _check_projection(collection, projection)
+    _, insert_method, data_class = COLLECTIONS[collection]
+    insert = getattr(storage, insert_method)
+
+    export_manifest_path = _export_manifest_path(directory, collection)
+    if not os.path.exists(export_manifest_path):
+        raise ValueError("'{directory}' does not contain an export of '{collection}'".format(
+            directory=directory, collection=collection))
+    export_manifest = _read_json(export_manifest_path)
+    if not export_manifest["complete"]:
+        raise ValueError("The export of '{collection}' in '{directory}' is not complete, resume the export "
+                         "first".format(directory=directory, collection=collection))
+    paths = [os.path.join(directory, name) for name in export_manifest["shards"]]
+
+    manifest_path = None
+    imported = []
+    if target is not None:
+        manifest_path = _import_manifest_path(directory, collection, where, projection, target, export_manifest)
+        if os.path.exists(manifest_path):
+            imported = _read_json(manifest_path)["shards"]
+
+    counter = 0
+    for index, path in enumerate(paths):
+        name = os.path.basename(path)
+        if name in imported:
+            continue
+        batch = []
+        for record in _read_shard(path):
+            if where and any(record.get(key) != value for key, value in where.items()):
+                continue
+            batch.append(data_class(_project(record, projection)))
+            if len(batch) == batch_size:
+                insert(batch)
+                counter += len(batch)
+                batch = []
+        if batch:
+            insert(batch)
+            counter += len(batch)
+        if manifest_path is not None:
+            imported.append(name)
+            _write_json(manifest_path, {"target": target, "where": where, "projection": projection,
+                                        "shards": imported})
+        if print_progress:
+            print("\r%.2f%%" % ((index + 1) / len(paths) * 100), end='')
+    if print_progress:
+        print("\n")
+    return counter
+
+
+def _check_collection(collection: str):
+    if collection not in COLLECTIONS:
+        raise ValueError("Unknown collection: '{collection}'".format(collection=collection))
+
+
+def _check_format(format: str, compression: str):
+    if format not in FORMATS:
+        raise ValueError("Unknown format: '{format}'".format(format=format))
+    if compression not in COMPRESSIONS:
+        raise ValueError("Unknown compression: '{compression}'".format(compression=compression))
+
+
+def _check_projection(collection: str, projection: list):
+    """
+    Check that the projection keeps all mandatory columns of the collection, otherwise the projected entries could
+    not be turned into data objects (neither during the import nor when re-importing a projected export)
+
+    :param collection: The name of the collection
+    :param projection: The list of keys to keep or None
+    """
+    if projection is None:
+        return
+    data_class = COLLECTIONS[collection][2]
+    missing = [column for column in data_class.MANDATORY_COLUMNS if column not in projection]
+    if missing:
+        raise ValueError("Projection drops mandatory columns of '{collection}': {missing}. Only these columns can be "
+                         "left out: {optional}".format(collection=collection, missing=missing,
+                                                       optional=optional_columns(collection)))
+
+
+def _check_where(where: dict):
+    """
+    Check that the import filter does not contain query operators, which would silently match nothing
+
+    :param where: The dictionary of top level keys and values or None
+    """
+    def contains_operator(value) -> bool:
+        if isinstance(value, dict):
+            return any(key.startswith("$") or contains_operator(v) for key, v in value.items())
+        if isinstance(value, list):
+            return any(contains_operator(v) for v in value)
+        return False
+
+    if where and contains_operator(where):
+        raise ValueError("The import filter only supports equality of top level keys, query operators are not "
+                         "supported: {where}".format(where=where))
+
+
+def _project(record: dict, projection: list) -> dict:
+    if projection is None:
+        return record
+    return {key: value for key, value in record.items() if key in projection}
+
+
+def _parse_shard_name(path: str) -> tuple:
+    """
+    Returns the format and the compression of a shard based on its file name
+
+    :param path: The path of the shard
+    :return: A tuple (format, compression) or None if the file is not a shard
+    """
+    name = os.path.basename(path)
+    for compression, ext in COMPRESSION_EXTENSIONS.items():
+        for format in FORMATS:
+            if name.endswith("." + format + ext):
+                return format, compression
+    return None
+
+
+def _list_shard_files(directory: str, collection: str) -> list:
+    """
+    Returns the sorted paths of all shard files of a collection in a directory, regardless of the export they belong to
+
+    :param directory: The directory containing the shards
+    :param collection: The name of the collection
+    :return: A list of paths
+    """
+    return sorted(path for path in glob.glob(os.path.join(directory, "{collection}-*".format(collection=collection)))
+                  if _parse_shard_name(path) is not None)
+
+
+def _export_manifest_path(directory: str, collection: str) -> str:
+    return os.path.join(directory, "{collection}.export.json".format(collection=collection))
+
+
+def _import_manifest_path(directory: str, collection: str, where: dict, projection: list, target: str,
+                          export_manifest: dict) -> str:
+    """
+    Returns the path of the manifest that records the imported shards for one target, one set of arguments and one
+    export
+
+    :param directory: The directory containing the shards
+    :param collection: The name of the collection
+    :param where: The import filter
+    :param projection: The projection
+    :param target: The name of the target storage
+    :param export_manifest: The manifest of the export
+    :return: The path of the manifest
+    """
+    key = json.dumps([target, where, sorted(projection) if projection is not None else None, export_manifest],
+                     sort_keys=True, default=str)
+    return os.path.join(directory, "{collection}.imported-{digest}.json".format(
+        collection=collection, digest=hashlib.md5(key.encode("utf-8")).hexdigest()))
+
+
+def _json_round_trip(value):
+    """
+    Returns the value as it would be read back from a JSON file, values JSON does not support are stored as strings
+    """
+    return json.loads(json.dumps(value, default=str))
+
+
+def _read_json(path: str):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_json(path: str, value):
+    """
+    Writes a JSON file atomically, so that it is either written completely or not at all
+
+    :param path: The path of the file
+    :param value: The value to write
+    """
+    tmp_path = path + PART_SUFFIX
+    with open(tmp_path, "w") as f:
+        json.dump(value, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def _open_shard(path: str, mode: str, compression: str):
+    """
+    Opens a shard file as binary stream with the given compression
+
+    :param path: The path of the shard
+    :param mode: "rb" or "wb"
+    :param compression: The compression (zstd, gzip or none)
+    :return: A binary file object
+    """
+    if compression == COMPRESSION_GZIP:
+        return gzip.open(path, mode)
+    if compression == COMPRESSION_ZSTD:
+        import zstandard
+        if mode == "wb":
+            return zstandard.ZstdCompressor().stream_writer(open(path, mode), closefd=True)
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, mode), closefd=True))
+    return open(path, mode)
+
+
+def _write_shard(path: str, records: list, format: str, compression: str) -> str:
+    """
+    Encodes and writes a single shard. The shard is written to a temporary file first, so that a shard file only
+    exists if it was written completely
+
+    :param path: The path of the shard
+    :param records: The list of dictionaries to write
+    :param format: The serialization format (jsonl or msgpack)
+    :param compression: The compression (zstd, gzip or none)
+    :return: The path of the shard
+    """
+    tmp_path = path + PART_SUFFIX
+    with _open_shard(tmp_path, "wb", compression) as f:
+        if format == FORMAT_MSGPACK:
+            import msgpack
+            packer = msgpack.Packer(use_bin_type=True)
+            for record in records:
+                f.write(packer.pack(record))
+        else:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+                f.write(b"\n")
+    os.replace(tmp_path, path)
+    return path
+
+
+def _read_shard(path: str):
+    """
+    Iterator that returns the dictionaries stored in a shard one by one
+
+    :param path: The path of the shard
+    :return: A dictionary with each iteration
+    """
+    parsed = _parse_shard_name(path)
+    if parsed is None:
+        raise ValueError("Not a shard file: '{path}'".format(path=path))
+    format, compression = parsed
+    with _open_shard(path, "rb", compression) as f:
+        if format == FORMAT_MSGPACK:
+            import msgpack
+            for record in msgpack.Unpacker(f, raw=False):
+                yield record
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line.decode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export/import collections to/from sharded, compressed files")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("collection", choices=sorted(COLLECTIONS))
+    parser.add_argument("directory")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=27017)
+    parser.add_argument("--database", default="research_project")
+    parser.add_argument("--filter", type=json.loads, default=None,
+                        help="JSON MongoDB query selecting the exported entries (export only)")
+    parser.add_argument("--where", type=json.loads, default=None,
+                        help="JSON object of top level keys and values the imported entries must equal, no query "
+                             "operators (import only)")
+    parser.add_argument("--projection", nargs="+", default=None,
+                        help="Keys to keep, must include all mandatory columns of the collection")
+    parser.add_argument("--format", choices=FORMATS, default=FORMAT_JSONL)
+    parser.add_argument("--compression", choices=COMPRESSIONS, default=COMPRESSION_GZIP)
+    parser.add_argument("--shard-size", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--processes", action="store_true", help="Encode in processes instead of threads")
+    args = parser.parse_args()
+    if args.command == "export" and args.where is not None:
+        parser.error("--where can only be used with import, use --filter to filter the export")
+    if args.command == "import" and args.filter is not None:
+        parser.error("--filter can only be used with export, use --where to filter the import")
+
+    from Scripts.mongodb import MongodbStorage
+    storage = MongodbStorage(host=args.host, port=args.port, database=args.database)
+    if args.command == "export":
+        paths = export_collection(storage, args.collection, args.directory, filter=args.filter,
+                                  projection=args.projection, format=args.format, compression=args.compression,
+                                  shard_size=args.shard_size, workers=args.workers, use_processes=args.processes)
+        print("Exported {count} shards".format(count=len(paths)))
+    else:
+        target = "{host}:{port}/{database}".format(host=args.host, port=args.port, database=args.database)
+        count = import_collection(storage, args.collection, args.directory, where=args.where,
+                                  projection=args.projection, target=target, batch_size=args.batch_size)
+        print("Imported {count} entries".format(count=count))
+
+
+if __name__ == "__main__":
+    main()
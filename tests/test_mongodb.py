@@ -0,0 +1,82 @@
+import importlib.util
+import os
+import subprocess
+import sys
+import unittest
+
+from Scripts import mongodb
+from Scripts.mongodb import MongodbStorage, get_client, close_clients
+
+# MongoClients connect in the background, so they can be created without a running server
+HOST = "localhost"
+PORT = 27999
+
+
+@unittest.skipIf(importlib.util.find_spec("pymongo") is None, "pymongo is not installed")
+class TestClientRegistry(unittest.TestCase):
+
+    def tearDown(self):
+        close_clients()
+
+    def test_get_client_is_shared_per_settings(self):
+        client = get_client(HOST, PORT)
+        self.assertIs(get_client(HOST, PORT), client)
+        self.assertIsNot(get_client(HOST, PORT, max_pool_size=10), client)
+        self.assertIsNot(get_client(HOST, PORT, compressors="zlib"), client)
+        self.assertIsNot(get_client(HOST, PORT + 1), client)
+
+    def test_storages_share_the_client(self):
+        first = MongodbStorage(host=HOST, port=PORT)
+        second = MongodbStorage(host=HOST, port=PORT, database="other")
+        self.assertIs(first.client, second.client)
+        self.assertIs(first.client, get_client(HOST, PORT))
+        self.assertEqual(second.db.name, "other")
+
+    def test_own_client(self):
+        shared = MongodbStorage(host=HOST, port=PORT)
+        first = MongodbStorage(host=HOST, port=PORT, shared_client=False)
+        second = MongodbStorage(host=HOST, port=PORT, shared_client=False)
+        self.assertIsNot(first.client, shared.client)
+        self.assertIsNot(first.client, second.client)
+        self.assertIs(first.client, first.client)
+        first.client.close()
+        second.client.close()
+
+    def test_close_clients(self):
+        storage = MongodbStorage(host=HOST, port=PORT)
+        old_client = storage.client
+        close_clients()
+        self.assertEqual(mongodb._clients, {})
+        self.assertIsNot(storage.client, old_client)
+        self.assertIs(storage.client, MongodbStorage(host=HOST, port=PORT).client)
+        self.assertIs(storage.client, get_client(HOST, PORT))
+
+    @unittest.skipIf(not hasattr(os, "fork"), "fork is not available")
+    def test_fork_creates_new_clients(self):
+        storage = MongodbStorage(host=HOST, port=PORT)
+        parent_client = storage.client
+        pid = os.fork()
+        if pid == 0:
+            # Child process: report the result with the exit code
+            ok = storage.client is not parent_client and storage.client is get_client(HOST, PORT) \
+                and MongodbStorage(host=HOST, port=PORT).client is storage.client
+            close_clients()
+            os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.WEXITSTATUS(status), 0)
+        # close_clients() in the child must not have touched the parent's clients
+        self.assertIs(storage.client, parent_client)
+        self.assertIs(get_client(HOST, PORT), parent_client)
+
+
+class TestLazyImport(unittest.TestCase):
+
+    def test_import_does_not_import_pymongo(self):
+        code = "import sys; import Scripts.mongodb, Scripts.transfer; print('pymongo' in sys.modules)"
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.check_output([sys.executable, "-c", code], cwd=root)
+        self.assertEqual(output.strip(), b"False")
+
+
+if __name__ == "__main__":
+    unittest.main()
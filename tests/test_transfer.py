@@ -0,0 +1,258 @@
+import importlib.util
+import os
+import random
+import tempfile
+import unittest
+
+from Scripts import transfer
+from Scripts.data_types import Post, Comment
+from Scripts.database_access import DataStorage
+
+
+class MemoryStorage(DataStorage):
+    """
+    DataStorage that keeps posts and comments in dictionaries, the iterate methods only support the empty filter
+    """
+
+    def __init__(self):
+        self.posts = {}
+        self.comments = {}
+        self.projections = []
+
+    def select(self, entries: dict, projection: list, sort_by_id: bool) -> list:
+        """
+        Returns the projected entries, in a different order on every call unless they are sorted by id (like a
+        MongoDB cursor without sort that does not guarantee any order)
+        """
+        self.projections.append(projection)
+        keys = sorted(entries) if sort_by_id else random.sample(list(entries), len(entries))
+        return [{key: value for key, value in entries[id].items() if projection is None or key in projection}
+                for id in keys]
+
+    def update_post(self, post: Post):
+        self.posts[post.post_id] = post.data
+
+    def insert_post(self, post: Post):
+        self.posts[post.post_id] = post.data
+
+    def insert_comment(self, comment: Comment):
+        self.comments[comment.id] = comment.data
+
+    def select_single_post(self, filter: dict) -> Post:
+        raise NotImplementedError
+
+    def select_multiple_posts(self, filter: dict) -> list:
+        raise NotImplementedError
+
+    def iterate_batch_post(self, filter: dict, batch_size: int) -> list:
+        raise NotImplementedError
+
+    def iterate_single_post(self, filter: dict, print_progress: bool = True, projection: list = None,
+                            sort_by_id: bool = False) -> list:
+        for data in self.select(self.posts, projection, sort_by_id):
+            yield Post(dict(data))
+
+    def insert_multiple_posts(self, posts: list):
+        for post in posts:
+            self.posts.setdefault(post.post_id, post.data)
+
+    def iterate_single_comment(self, filter: dict, print_progress: bool = True, projection: list = None,
+                               sort_by_id: bool = False) -> list:
+        for data in self.select(self.comments, projection, sort_by_id):
+            yield Comment(dict(data))
+
+    def insert_multiple_comments(self, comments: list):
+        for comment in comments:
+            self.comments.setdefault(comment.id, comment.data)
+
+    def count_posts(self, filter: dict) -> int:
+        return len(self.posts)
+
+    def count_comments(self, filter: dict) -> int:
+        return len(self.comments)
+
+    def insert_emotion(self, emotion):
+        raise NotImplementedError
+
+    def insert_multiple_emotions(self, emotions: list):
+        raise NotImplementedError
+
+    def iterate_single_emotion(self, filter: dict, print_progress: bool = True, projection: list = None,
+                               sort_by_id: bool = False) -> list:
+        raise NotImplementedError
+
+    def select_single_emotion(self, filter: dict):
+        raise NotImplementedError
+
+    def insert_sentence(self, sentence):
+        raise NotImplementedError
+
+    def insert_multiple_sentences(self, sentences: list):
+        raise NotImplementedError
+
+    def select_single_sentence(self, filter: dict):
+        raise NotImplementedError
+
+    def iterate_single_sentence(self, filter: dict, print_progress: bool = True, projection: list = None,
+                                sort_by_id: bool = False) -> list:
+        raise NotImplementedError
+
+
+def create_storage(amount: int) -> MemoryStorage:
+    storage = MemoryStorage()
+    for i in range(amount):
+        post = Post.create_from_single_values(str(i), "user%d" % (i % 3), "message é %d" % i, "2017-01-01",
+                                              "link", {"like": float(i)}, i % 2 == 0)
+        post.sentiment = 0.5
+        storage.insert_post(post)
+        storage.insert_comment(Comment.create_from_single_values(str(i), "-1", "user", "content", "2017-01-01"))
+    return storage
+
+
+class TestTransfer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+        self.storage = create_storage(250)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def export(self, **kwargs) -> list:
+        arguments = dict(shard_size=40, workers=2, print_progress=False)
+        arguments.update(kwargs)
+        return transfer.export_collection(self.storage, "posts", self.directory, **arguments)
+
+    def round_trip(self, format: str, compression: str, use_processes: bool = False):
+        paths = self.export(format=format, compression=compression, use_processes=use_processes)
+        self.assertEqual(len(paths), 7)
+        target = MemoryStorage()
+        count = transfer.import_collection(target, "posts", self.directory, batch_size=30, print_progress=False)
+        self.assertEqual(count, 250)
+        self.assertEqual(target.posts, self.storage.posts)
+
+    def test_round_trip_jsonl_gzip(self):
+        self.round_trip(transfer.FORMAT_JSONL, transfer.COMPRESSION_GZIP)
+
+    def test_round_trip_jsonl_processes(self):
+        self.round_trip(transfer.FORMAT_JSONL, transfer.COMPRESSION_NONE, use_processes=True)
+
+    @unittest.skipIf(importlib.util.find_spec("msgpack") is None, "msgpack is not installed")
+    def test_round_trip_msgpack(self):
+        self.round_trip(transfer.FORMAT_MSGPACK, transfer.COMPRESSION_GZIP)
+
+    @unittest.skipIf(importlib.util.find_spec("zstandard") is None, "zstandard is not installed")
+    def test_round_trip_zstd(self):
+        self.round_trip(transfer.FORMAT_JSONL, transfer.COMPRESSION_ZSTD)
+
+    def test_export_resume_skips_existing_shards(self):
+        paths = self.export()
+        os.remove(paths[3])
+        mtimes = [os.path.getmtime(path) for path in paths if path != paths[3]]
+        self.assertEqual(self.export(), paths)
+        self.assertTrue(os.path.exists(paths[3]))
+        self.assertEqual([os.path.getmtime(path) for path in paths if path != paths[3]], mtimes)
+
+    def test_export_resume_writes_the_lost_shard(self):
+        paths = self.export()
+        os.remove(paths[3])
+        self.export()
+        target = MemoryStorage()
+        self.assertEqual(transfer.import_collection(target, "posts", self.directory, print_progress=False), 250)
+        self.assertEqual(target.posts, self.storage.posts)
+
+    def test_export_resume_rejects_other_arguments(self):
+        paths = self.export()
+        os.remove(paths[3])
+        with self.assertRaises(ValueError):
+            self.export(shard_size=50)
+        with self.assertRaises(ValueError):
+            self.export(projection=Post.MANDATORY_COLUMNS)
+
+    def test_export_rejects_shards_without_manifest(self):
+        self.export()
+        os.remove(os.path.join(self.directory, "posts.export.json"))
+        with self.assertRaises(ValueError):
+            self.export()
+
+    def test_import_rejects_incomplete_export(self):
+        with self.assertRaises(ValueError):
+            transfer.import_collection(MemoryStorage(), "posts", self.directory, print_progress=False)
+        self.export()
+        # Simulate an export that was interrupted after writing its first shards
+        manifest = transfer._read_json(os.path.join(self.directory, "posts.export.json"))
+        transfer._write_json(os.path.join(self.directory, "posts.export.json"), dict(manifest, complete=False))
+        with self.assertRaises(ValueError):
+            transfer.import_collection(MemoryStorage(), "posts", self.directory, print_progress=False)
+
+    def test_import_ignores_shards_not_in_manifest(self):
+        self.export()
+        extra = dict(self.storage.posts["0"], _id="extra")
+        for format, compression in [(transfer.FORMAT_JSONL, transfer.COMPRESSION_GZIP),
+                                    (transfer.FORMAT_JSONL, transfer.COMPRESSION_NONE)]:
+            transfer._write_shard(transfer.shard_path(self.directory, "posts", 10, format, compression), [extra],
+                                  format, compression)
+        target = MemoryStorage()
+        self.assertEqual(transfer.import_collection(target, "posts", self.directory, print_progress=False), 250)
+        self.assertNotIn("extra", target.posts)
+
+    def test_import_resume_is_per_target(self):
+        self.export()
+        first = MemoryStorage()
+        self.assertEqual(transfer.import_collection(first, "posts", self.directory, target="first",
+                                                    print_progress=False), 250)
+        self.assertEqual(transfer.import_collection(first, "posts", self.directory, target="first",
+                                                    print_progress=False), 0)
+        second = MemoryStorage()
+        self.assertEqual(transfer.import_collection(second, "posts", self.directory, target="second",
+                                                    print_progress=False), 250)
+
+    def test_filtered_import_does_not_mark_unfiltered_import(self):
+        self.export()
+        target = MemoryStorage()
+        self.assertEqual(transfer.import_collection(target, "posts", self.directory, where={"user_id": "nobody"},
+                                                    target="target", print_progress=False), 0)
+        self.assertEqual(transfer.import_collection(target, "posts", self.directory, target="target",
+                                                    print_progress=False), 250)
+
+    def test_import_where(self):
+        self.export()
+        target = MemoryStorage()
+        transfer.import_collection(target, "posts", self.directory, where={"user_id": "user1"},
+                                   print_progress=False)
+        self.assertEqual(len(target.posts), 83)
+        self.assertTrue(all(data["user_id"] == "user1" for data in target.posts.values()))
+
+    def test_import_where_rejects_operators(self):
+        self.export()
+        with self.assertRaises(ValueError):
+            transfer.import_collection(MemoryStorage(), "posts", self.directory, where={"date": {"$gte": "2017"}},
+                                       print_progress=False)
+
+    def test_projection_drops_optional_columns(self):
+        projection = [column for column in Post.MANDATORY_COLUMNS]
+        self.export(projection=projection)
+        self.assertEqual(self.storage.projections, [projection])
+        target = MemoryStorage()
+        transfer.import_collection(target, "posts", self.directory, print_progress=False)
+        self.assertTrue(all(sorted(data) == sorted(projection) for data in target.posts.values()))
+
+    def test_projection_rejects_mandatory_columns(self):
+        with self.assertRaises(ValueError):
+            transfer.export_collection(self.storage, "comments", self.directory, projection=["content"],
+                                       print_progress=False)
+        self.export()
+        with self.assertRaises(ValueError):
+            transfer.import_collection(MemoryStorage(), "posts", self.directory, projection=["_id", "message"],
+                                       print_progress=False)
+
+    def test_import_skips_files_that_are_not_shards(self):
+        self.export()
+        open(os.path.join(self.directory, "posts-notes.txt"), "w").close()
+        target = MemoryStorage()
+        self.assertEqual(transfer.import_collection(target, "posts", self.directory, print_progress=False), 250)
+
+
+if __name__ == "__main__":
+    unittest.main()